@@ -1,8 +1,19 @@
 #!/usr/bin/env python
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 
+import argparse
+import bisect
+import datetime
 import json
+import mmap
+import multiprocessing
+import os
+import re
 import six
+import struct
+import sys
+import tempfile
+import time
 
 from openpyxl.reader.excel import load_workbook
 
@@ -11,6 +22,81 @@ class CopyException(Exception):
     pass
 
 
+def _text(value):
+    """
+    Convert a stored cell value to text. Empty cells become empty strings.
+    """
+    if value is None:
+        return ''
+
+    if six.PY3:
+        return str(value)
+    else:
+        return unicode(value)
+
+
+def _json_default(value):
+    """
+    Serialize the native cell types that json doesn't know about. Dates
+    and times become ISO 8601 strings and durations a number of seconds.
+    """
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+
+    raise TypeError('%r is not JSON serializable' % value)
+
+
+def _serialize_rows(rows, columns, typed=False):
+    """
+    Serialize a sheet's rows in a JSON-ready format. Sheets with "key"
+    and "value" columns become a dict of values, sheets with just a
+    "key" column a dict of dicts and any other sheet a list of dicts.
+    """
+    obj = OrderedDict()
+
+    if 'key' in columns and 'value' in columns:
+        for row in rows:
+            if typed:
+                obj[row['key']] = row.typed('value')
+            else:
+                obj[row['key']] = row['value']
+    elif 'key' in columns:
+        for row in rows:
+            obj[row['key']] = OrderedDict()
+
+            for column in columns:
+                if column == 'key':
+                    continue
+
+                if typed:
+                    value = row.typed(column)
+                else:
+                    value = row[column]
+
+                obj[row['key']][column] = value
+    else:
+        obj = []
+
+        for row in rows:
+            row_obj = OrderedDict()
+
+            for i, column in enumerate(columns):
+                value = row.typed(i)
+
+                # Empty cells stay null, as they always have
+                if not typed and value is not None:
+                    value = row[i]
+
+                row_obj[column] = value
+
+            obj.append(row_obj)
+
+    return obj
+
+
 class Error(object):
     """
     An error object that can mimic the structure of the COPY data,
@@ -45,60 +131,84 @@ class Error(object):
 class Row(object):
     """
     Wraps a row of copy for error handling.
+
+    Rows are lightweight views: the cells live in the sheet's column
+    storage and a Row only records which sheet and which row it is.
     """
-    _sheet = None
-    _row = []
-    _columns = []
-    _index = 0
+    __slots__ = ('_sheet', '_index')
 
-    def __init__(self, sheet, row, columns, index):
+    def __init__(self, sheet, index):
         self._sheet = sheet
-        self._row = row
-        self._columns = columns
         self._index = index
 
+    @property
+    def _row(self):
+        return [self.typed(i) for i in six.moves.range(len(self))]
+
+    @property
+    def _columns(self):
+        return self._sheet._columns
+
     def __getitem__(self, i):
         """
         Allow dict-style item access by index (column id), or by column name.
         """
+        position = self._position(i)
+
+        if isinstance(position, Error):
+            return position
+
+        return self._sheet._cell_text(position, self._index)
+
+    def typed(self, i):
+        """
+        Get a cell's stored value without converting it to text. For a
+        Copy loaded with ``typed=True`` this is the native cell value
+        (int, float, datetime, bool or None).
+        """
+        position = self._position(i)
+
+        if isinstance(position, Error):
+            return position
+
+        return self._sheet._data[position][self._index]
+
+    def _position(self, i):
+        """
+        Find the storage position of a column by index or name. Columns
+        with the same name all read from the last one.
+        """
         if isinstance(i, int):
-            if i >= len(self._row):
+            if i >= len(self._sheet._data):
                 return Error('COPY.%s.%i.%i [column index outside range]' % (
                     self._sheet.name,
                     self._index, i
                 ))
 
-            value = self._row[i]
+            return self._sheet._column_index[self._sheet._columns[i]]
 
-            if six.PY3:
-                return str(value or '')
-            else:
-                return unicode(value or '')
+        position = self._sheet._column_index.get(i)
 
-        if i not in self._columns:
+        if position is None:
             return Error('COPY.%s.%i.%s [column does not exist in sheet]' % (
                 self._sheet.name,
                 self._index,
                 i
             ))
 
-        value = self._row[self._columns.index(i)]
-
-        if six.PY3:
-            return str(value or '')
-        else:
-            return unicode(value or '')
+        return position
 
     def __iter__(self):
         return iter(self._row)
 
     def __len__(self):
-        return len(self._row)
+        return len(self._sheet._data)
 
     def __str__(self):
-        if 'value' in self._columns:
-            value = self._row[self._columns.index('value')]
-            return str(value or '')
+        position = self._sheet._column_index.get('value')
+
+        if position is not None:
+            return self._sheet._cell_text(position, self._index)
 
         return Error('COPY.%s.%s [no value column in sheet]' % (
             self._sheet.name,
@@ -109,57 +219,169 @@ class Row(object):
         return self.__str__()
 
     def __bool__(self):
-        if 'value' in self._columns:
-            val = self._row[self._columns.index('value')]
+        position = self._sheet._column_index.get('value')
 
-            if not val:
+        if position is not None:
+            if self._sheet._data[position][self._index] is None:
                 return False
 
-            return bool(len(val))
+            return bool(len(self._sheet._cell_text(position, self._index)))
 
         return True
 
     def __nonzero__(self):
-        if 'value' in self._columns:
-            val = self._row[self._columns.index('value')]
-
-            if not val:
-                return False
-
-            return bool(len(val))
-
-        return True
+        return self.__bool__()
 
 
 class Sheet(object):
     """
     Wrap copy text, for a single worksheet, for error handling.
+
+    Cells are stored by column: ``data`` holds one sequence per entry in
+    ``columns``, each with a value for every row. Rows are created on
+    demand when the sheet is indexed or iterated.
+
+    Slicing a sheet, or calling :meth:`page`, returns another Sheet that
+    is a view of a window of the same rows.
     """
     name = None
-    _sheet = []
+    _data = []
     _columns = []
+    _column_index = {}
+    _base = None
+    _start = 0
+    _step = 1
+    _length = 0
+    _keys = None
+    _transforms = {}
+    _transformed = {}
 
     def __init__(self, name, data, columns):
         self.name = name
-        self._sheet = [
-            Row(self, [row[c] for c in columns], columns, i)
-            for i, row in enumerate(data)
-        ]
+        self._data = data
         self._columns = columns
+        self._column_index = {}
+        self._length = len(data[0]) if data else 0
+        self._transforms = {}
+        self._transformed = {}
+
+        # If a header is repeated, its last column wins
+        for i, column in enumerate(columns):
+            self._column_index[column] = i
+
+    def _view(self, start, step, length):
+        """
+        Make a sheet that shares this one's storage but only covers
+        ``length`` rows, starting at row ``start`` and ``step`` apart.
+        """
+        view = self.__class__.__new__(self.__class__)
+        view.__dict__.update(self.__dict__)
+        view._base = self._base if self._base is not None else self
+        view._start = start
+        view._step = step
+        view._length = length
+
+        return view
+
+    def _contains(self, index):
+        """
+        Check whether a row of the underlying storage is in this sheet.
+        """
+        offset = index - self._start
+
+        if offset % self._step:
+            return False
+
+        return 0 <= offset // self._step < self._length
+
+    def page(self, n, size):
+        """
+        Get page ``n``, counting from 1, of a sheet split into pages of
+        ``size`` rows. Pages past the end are empty.
+        """
+        if n < 1 or size < 1:
+            raise ValueError('Page number and size must be at least 1')
+
+        return self[(n - 1) * size:n * size]
+
+    def _set_transforms(self, transforms):
+        """
+        Attach the transforms that apply to this sheet, dropping any
+        previously memoized results. Transforms that aren't lazy are run
+        over every cell they apply to straight away.
+        """
+        # Update in place, so views of this sheet see the changes
+        self._transforms.clear()
+        self._transformed.clear()
+        eager = set()
+
+        for transform in transforms:
+            for position, column in enumerate(self._columns):
+                if not transform.applies(self.name, column):
+                    continue
+
+                self._transforms.setdefault(position, []).append(
+                    transform.func
+                )
+
+                if not transform.lazy:
+                    eager.add(position)
+
+        for position in self._transforms:
+            self._transformed[position] = {}
+
+        for position in eager:
+            for i in six.moves.range(len(self._data[position])):
+                self._cell_text(position, i)
+
+    def _cell_text(self, position, index):
+        """
+        Get a cell as text, run through any transforms for its column.
+        Transformed text is memoized alongside the sheet's data.
+        """
+        value = self._data[position][index]
+        transforms = self._transforms.get(position)
+
+        if not transforms:
+            return _text(value)
+
+        cache = self._transformed[position]
+
+        if index not in cache:
+            text = _text(value)
+
+            for transform in transforms:
+                text = transform(text)
+
+            cache[index] = text
+
+        return cache[index]
 
     def __getitem__(self, i):
         """
         Allow dict-style item access by index (row id), or by
-        row name ("key" column).
+        row name ("key" column). Slices return a view of those rows.
         """
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self._length)
+            length = len(six.moves.range(start, stop, step))
+
+            return self._view(
+                self._start + start * self._step,
+                self._step * step,
+                length
+            )
+
         if isinstance(i, int):
-            if i >= len(self._sheet):
+            index = i + self._length if i < 0 else i
+
+            if not 0 <= index < self._length:
                 return Error('COPY.%s.%i [row index outside range]' % (
                     self.name,
                     i
                 ))
 
-            return self._sheet[i]
+            return Row(self, self._start + index * self._step)
 
         if 'key' not in self._columns:
             return Error('COPY.%s.%s [no key column in sheet]' % (
@@ -167,68 +389,259 @@ class Sheet(object):
                 i
             ))
 
-        for row in self._sheet:
-            if row['key'] == i:
-                return row
+        index = self._key_index().get(i)
 
-        return Error('COPY.%s.%s [key does not exist in sheet]' % (
-            self.name,
-            i
-        ))
+        if index is None or not self._contains(index):
+            return Error('COPY.%s.%s [key does not exist in sheet]' % (
+                self.name,
+                i
+            ))
+
+        return Row(self, index)
+
+    def _key_index(self):
+        """
+        Map each key to the position of the first row with that key.
+        Built on first use, and shared by every view of a sheet.
+        """
+        if self._base is not None:
+            return self._base._key_index()
+
+        if self._keys is None:
+            keys = {}
+            column = self._data[self._column_index['key']]
+
+            for i, key in enumerate(column):
+                keys.setdefault(_text(key), i)
+
+            self._keys = keys
+
+        return self._keys
+
+    def get_many(self, keys):
+        """
+        Look up a list of rows by index or key in one pass. Returns the
+        rows (or Errors) in the same order as ``keys``.
+        """
+        if 'key' not in self._columns:
+            return [self[key] for key in keys]
+
+        index = self._key_index()
+        rows = []
+
+        for key in keys:
+            if isinstance(key, int):
+                rows.append(self[key])
+                continue
+
+            i = index.get(key)
+
+            if i is None or not self._contains(i):
+                row = Error('COPY.%s.%s [key does not exist in sheet]' % (
+                    self.name,
+                    key
+                ))
+            else:
+                row = Row(self, i)
+
+            rows.append(row)
+
+        return rows
 
     def __iter__(self):
-        return iter(self._sheet)
+        for i in six.moves.range(self._length):
+            yield Row(self, self._start + i * self._step)
 
     def __len__(self):
-        return len(self._sheet)
+        return self._length
 
-    def _serialize(self):
+    def _serialize(self, typed=False):
         """
-        Serialize the sheet in a JSON-ready format.
+        Serialize the sheet in a JSON-ready format. If ``typed`` is True,
+        cells keep their stored values instead of being converted to text.
         """
-        obj = OrderedDict()
+        return _serialize_rows(self, self._columns, typed)
 
-        if 'key' in self._columns and 'value' in self._columns:
-            for row in self:
-                obj[row['key']] = row['value']
-        elif 'key' in self._columns:
-            for row in self:
-                obj[row['key']] = OrderedDict()
+    def json(self, typed=False):
+        """
+        Serialize the sheet as JSON.
+        """
+        return json.dumps(self._serialize(typed), default=_json_default)
 
-                for column in self._columns:
-                    if column == 'key':
-                        continue
 
-                    value = row[column]
+# Layout of a file written by Copy.dump: the magic bytes, then the offset
+# and length of a JSON header describing each sheet. Each column is stored
+# as one type tag byte per row, a table of (rows + 1) cell offsets and the
+# encoded cells themselves.
+_DUMP_MAGIC = b'COPYTEXT\x01'
+_DUMP_PREFIX = struct.Struct('<QQ')
+_DUMP_OFFSET = struct.Struct('<Q')
 
-                    obj[row['key']][column] = value
-        else:
-            obj = []
+_NONE, _TEXT, _INT, _FLOAT, _BOOL, _DATETIME, _DATE, _TIME, _TIMEDELTA = \
+    range(9)
 
-            for row in self:
-                row_obj = OrderedDict()
 
-                for i, column in enumerate(row):
-                    row_obj[self._columns[i]] = column
+def _encode_cell(value):
+    """
+    Encode a cell value as a type tag and bytes for Copy.dump.
+    """
+    if value is None:
+        return _NONE, b''
 
-                obj.append(row_obj)
+    if isinstance(value, bool):
+        return _BOOL, b'1' if value else b'0'
 
-        return obj
+    if isinstance(value, six.integer_types):
+        return _INT, str(value).encode('ascii')
+
+    if isinstance(value, float):
+        return _FLOAT, repr(value).encode('ascii')
+
+    if isinstance(value, datetime.datetime) and value.tzinfo is None:
+        return _DATETIME, value.isoformat().encode('ascii')
+
+    if isinstance(value, datetime.date):
+        return _DATE, value.isoformat().encode('ascii')
+
+    if isinstance(value, datetime.time) and value.tzinfo is None:
+        return _TIME, value.isoformat().encode('ascii')
+
+    if isinstance(value, datetime.timedelta):
+        return _TIMEDELTA, repr(value.total_seconds()).encode('ascii')
+
+    return _TEXT, _text(value).encode('utf-8')
+
+
+def _parse_datetime(raw, fmt):
+    raw = raw.decode('ascii')
+
+    if '.' in raw:
+        fmt += '.%f'
+
+    return datetime.datetime.strptime(raw, fmt)
+
+
+def _decode_cell(tag, raw):
+    """
+    Decode a cell value written by _encode_cell.
+    """
+    if tag == _NONE:
+        return None
+
+    if tag == _TEXT:
+        return raw.decode('utf-8')
+
+    if tag == _INT:
+        return int(raw)
+
+    if tag == _FLOAT:
+        return float(raw)
+
+    if tag == _BOOL:
+        return raw == b'1'
+
+    if tag == _DATETIME:
+        return _parse_datetime(raw, '%Y-%m-%dT%H:%M:%S')
+
+    if tag == _DATE:
+        return _parse_datetime(raw, '%Y-%m-%d').date()
+
+    if tag == _TIME:
+        return _parse_datetime(raw, '%H:%M:%S').time()
+
+    if tag == _TIMEDELTA:
+        return datetime.timedelta(seconds=float(raw))
+
+    raise CopyException('Unknown cell type %i in copy dump' % tag)
+
+
+class _MappedColumn(object):
+    """
+    One column of a sheet, read straight out of a memory-mapped dump.
+    Cells are only decoded when they're accessed.
+    """
+    __slots__ = ('_buffer', '_tags', '_offsets', '_length')
+
+    def __init__(self, buffer, tags, offsets, length):
+        self._buffer = buffer
+        self._tags = tags
+        self._offsets = offsets
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._length
+
+        if not 0 <= i < self._length:
+            raise IndexError('column index out of range')
+
+        tag = struct.unpack_from('<B', self._buffer, self._tags + i)[0]
+        start, end = struct.unpack_from(
+            '<QQ', self._buffer, self._offsets + 8 * i
+        )
+
+        return _decode_cell(tag, self._buffer[start:end])
+
+    def __iter__(self):
+        for i in six.moves.range(self._length):
+            yield self[i]
 
-    def json(self):
+
+class Transform(object):
+    """
+    A function run over the text of cells in a given sheet and column.
+    A sheet or column of None matches any sheet or any column other than
+    "key", so that rows can still be looked up by their untransformed key.
+    """
+    func = None
+    sheet = None
+    column = None
+    lazy = True
+
+    def __init__(self, func, sheet=None, column=None, lazy=True):
+        self.func = func
+        self.sheet = sheet
+        self.column = column
+        self.lazy = lazy
+
+    def applies(self, sheet, column):
         """
-        Serialize the sheet as JSON.
+        Check whether this transform applies to a column of a sheet.
         """
-        return json.dumps(self._serialize())
+        if self.sheet is not None and self.sheet != sheet:
+            return False
+
+        if self.column is None:
+            return column != 'key'
+
+        return self.column == column
 
 
 class Copy(object):
     """
     Wraps copy text, for multiple worksheets, for error handling.
+
+    By default every cell is stored as text. Pass ``typed=True`` to keep
+    native cell values (numbers, dates, booleans); they are then only
+    converted to text when a template asks for them.
+
+    ``transforms`` is a list of :class:`Transform` objects to run over
+    the text of matching cells, see :meth:`add_transform`.
+
+    Each sheet is read until ``max_empty_rows`` consecutive empty rows
+    are found. Pass None to always read every row.
     """
+    stats = {}
 
-    def __init__(self, filename):
+    def __init__(self, filename, typed=False, transforms=None,
+                 max_empty_rows=1000):
         self._filename = filename
+        self._typed = typed
+        self._transforms = list(transforms or [])
+        self._max_empty_rows = max_empty_rows
         self._copy = {}
         self.load()
 
@@ -241,83 +654,1041 @@ class Copy(object):
 
         return self._copy[name]
 
-    def load(self):
+    def add_transform(self, func, sheet=None, column=None, lazy=True):
+        """
+        Run ``func`` over the text of every cell in ``column`` of
+        ``sheet``. Leave ``sheet`` or ``column`` out to match any. Cells
+        are transformed on first access, or straight away if ``lazy`` is
+        False, and the result is kept until the copy is reloaded.
+        """
+        self._transforms.append(Transform(func, sheet, column, lazy))
+
+        for sheet in self._copy.values():
+            sheet._set_transforms(self._transforms)
+
+    def _sheet(self, name, data, columns):
+        """
+        Build a sheet and attach this copy's transforms to it.
+        """
+        sheet = Sheet(name, data, columns)
+
+        if self._transforms:
+            sheet._set_transforms(self._transforms)
+
+        return sheet
+
+    def resolve_many(self, paths):
+        """
+        Resolve a list of ``(sheet, key, column)`` paths in one pass.
+        Each path may also be ``(sheet, key)`` or ``(sheet,)``. Returns
+        the values (or Errors) in the same order as ``paths``.
+
+        ``paths`` may be a :class:`CompiledPaths` to reuse across renders.
+        """
+        if not isinstance(paths, CompiledPaths):
+            paths = CompiledPaths(paths)
+
+        return paths.resolve(self)
+
+    def load(self, sheets=None):
         """
-        Parses the downloaded Excel file.
+        Parses the downloaded Excel file. Pass a list of sheet names to
+        only reload those sheets.
         """
         try:
-            book = load_workbook(self._filename, data_only=True)
+            book = load_workbook(
+                self._filename,
+                data_only=True,
+                read_only=True
+            )
         except IOError:
             raise CopyException(
                 '"%s" does not exist. Have you run "fab update_copy"?'
                 % self._filename
             )
 
-        for sheet in book:
-            columns = []
+        if sheets is None:
+            self.stats = OrderedDict()
+
+        try:
+            for sheet in book:
+                if sheets is not None and sheet.title not in sheets:
+                    continue
+
+                self._copy[sheet.title] = self._load_sheet(sheet)
+        finally:
+            book.close()
+
+    def _load_sheet(self, sheet):
+        """
+        Parses one worksheet.
+
+        Only the columns under the header are read, and reading stops
+        after ``max_empty_rows`` consecutive empty rows, so sheets whose
+        formatting extends far past their data don't have to be scanned
+        to the end. Row counts are recorded in ``stats``.
+        """
+        columns = []
+
+        for c in next(sheet.iter_rows(max_row=1), ()):
+            d = c.value
+
+            # Columns cease once an empty header is found
+            if d is None:
+                break
+
+            if six.PY3:
+                columns.append(str(d))
+            else:
+                columns.append(unicode(d))
+
+        data = [[] for c in columns]
+        scanned = 0
+        skipped = 0
+        empty = 0
+
+        if columns:
+            rows = sheet.iter_rows(min_row=2, max_col=len(columns))
+        else:
             rows = []
 
-            for i, row in enumerate(sheet.rows):
-                if i == 0:
-                    for c in row:
-                        d = c.internal_value
+        for row in rows:
+            scanned += 1
+            row_data = []
 
-                        # Columns cease once an empty header is found
-                        if d is None:
-                            break
+            for c in row:
+                d = c.value
 
-                        if six.PY3:
-                            columns.append(str(d))
-                        else:
-                            columns.append(unicode(d))
+                if d is None or self._typed:
+                    row_data.append(d)
+                else:
+                    row_data.append(_text(d))
 
-                    continue
+            # If nothing in a row then it doesn't matter
+            if all([c is None for c in row_data]):
+                skipped += 1
+                empty += 1
 
-                row_data = []
+                if self._max_empty_rows and empty >= self._max_empty_rows:
+                    break
 
-                for c in row[0:len(columns)]:
-                    d = c.internal_value
+                continue
 
-                    if d is None:
-                        row_data.append(None)
-                    else:
-                        if six.PY3:
-                            row_data.append(str(d))
-                        else:
-                            row_data.append(unicode(d))
+            empty = 0
 
-                # If nothing in a row then it doesn't matter
-                if all([c is None for c in row_data]):
-                    continue
+            # Pad rows that end before the header does
+            row_data.extend([None] * (len(columns) - len(row_data)))
+
+            for column, d in zip(data, row_data):
+                column.append(d)
+
+        # Read-only worksheets don't always know their dimensions
+        if sheet.max_row:
+            unscanned = max(sheet.max_row - 1 - scanned, 0)
+        else:
+            unscanned = None
+
+        self.stats[sheet.title] = {
+            'rows': scanned - skipped,
+            'skipped_rows': skipped,
+            'unscanned_rows': unscanned
+        }
+
+        return self._sheet(sheet.title, data, columns)
+
+    def dump(self, filename):
+        """
+        Write the copy to a file that :class:`SharedCopy` can attach to.
+
+        The file is written next to ``filename`` and then renamed over
+        it, so processes attached to an older dump keep reading it
+        until they refresh.
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_DUMP_MAGIC)
+                f.write(_DUMP_PREFIX.pack(0, 0))
+
+                sheets = []
+
+                for name, sheet in self._copy.items():
+                    data = []
+
+                    for column in sheet._data:
+                        data.append(self._dump_column(f, column))
+
+                    sheets.append({
+                        'name': name,
+                        'columns': sheet._columns,
+                        'rows': len(sheet),
+                        'data': data
+                    })
+
+                header = json.dumps({
+                    'typed': self._typed,
+                    'sheets': sheets
+                }).encode('utf-8')
+
+                start = f.tell()
+                f.write(header)
+                f.seek(len(_DUMP_MAGIC))
+                f.write(_DUMP_PREFIX.pack(start, len(header)))
+
+            os.chmod(path, 0o644)
+            getattr(os, 'replace', os.rename)(path, filename)
+        except Exception:
+            os.remove(path)
+            raise
+
+    def _dump_column(self, f, column):
+        """
+        Write one column of a sheet for dump(). Returns the file offsets
+        of its type tags and its cell offsets.
+        """
+        cells = [_encode_cell(value) for value in column]
 
-                clean_data = {}
+        tags = f.tell()
+        f.write(bytearray(tag for tag, raw in cells))
 
-                # Don't include columns with None headers
-                for i, c in enumerate(columns):
-                    if c is None:
-                        continue
+        # Align the offset table
+        f.write(b'\x00' * (-f.tell() % 8))
+        offsets = f.tell()
 
-                    clean_data[c] = row_data[i]
+        position = offsets + 8 * (len(cells) + 1)
+        f.write(_DUMP_OFFSET.pack(position))
 
-                rows.append(clean_data)
+        for tag, raw in cells:
+            position += len(raw)
+            f.write(_DUMP_OFFSET.pack(position))
 
-            self._copy[sheet.title] = Sheet(sheet.title, rows, columns)
+        for tag, raw in cells:
+            f.write(raw)
 
-    def _serialize(self):
+        return tags, offsets
+
+    def _serialize(self, typed=False):
         """
         Serialize the copy as an OrderedDict
         """
         obj = OrderedDict()
 
         for name, sheet in self._copy.items():
-            obj[name] = sheet._serialize()
+            obj[name] = sheet._serialize(typed)
 
         return obj
 
-    def json(self):
+    def json(self, typed=False):
         """
         Serialize the copy as JSON.
         """
-        import json
+        return json.dumps(self._serialize(typed), default=_json_default)
+
+
+class SharedCopy(Copy):
+    """
+    A read-only Copy served from a file written by :meth:`Copy.dump`.
+
+    The file is memory-mapped, so every process that attaches to the same
+    dump shares one copy of it through the operating system's page cache.
+    Cells are decoded from the mapping as they are read.
+    """
+
+    def __init__(self, filename, transforms=None):
+        self._filename = filename
+        self._typed = False
+        self._transforms = list(transforms or [])
+        self._copy = {}
+        self._stat = None
+        self.load()
+
+    def load(self):
+        """
+        Map the dump file and attach to it.
+        """
+        try:
+            f = open(self._filename, 'rb')
+        except IOError:
+            raise CopyException(
+                '"%s" does not exist. Have you run Copy.dump?'
+                % self._filename
+            )
+
+        with f:
+            stat = os.fstat(f.fileno())
+
+            if stat.st_size < len(_DUMP_MAGIC) + _DUMP_PREFIX.size:
+                buffer = None
+            else:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if buffer is None or buffer[:len(_DUMP_MAGIC)] != _DUMP_MAGIC:
+            raise CopyException(
+                '"%s" is not a copytext dump.' % self._filename
+            )
+
+        start, length = _DUMP_PREFIX.unpack_from(buffer, len(_DUMP_MAGIC))
+        header = json.loads(buffer[start:start + length].decode('utf-8'))
+
+        copy = {}
+
+        for sheet in header['sheets']:
+            data = [
+                _MappedColumn(buffer, tags, offsets, sheet['rows'])
+                for tags, offsets in sheet['data']
+            ]
+
+            copy[sheet['name']] = self._sheet(
+                sheet['name'], data, sheet['columns']
+            )
+
+        # Swap in the new data in one step. Sheets and rows from the
+        # previous dump keep its mapping alive until they're released.
+        self._typed = header['typed']
+        self._copy = copy
+        self._stat = (stat.st_dev, stat.st_ino, stat.st_mtime)
+
+    def refresh(self):
+        """
+        Attach to a new dump if the file has been replaced since it was
+        loaded. Returns True if it was.
+        """
+        try:
+            stat = os.stat(self._filename)
+        except OSError:
+            return False
+
+        if (stat.st_dev, stat.st_ino, stat.st_mtime) == self._stat:
+            return False
+
+        self.load()
+
+        return True
+
+
+@six.python_2_unicode_compatible
+class OverlayRow(object):
+    """
+    A row of an OverlaySheet: the rows with the same key in each layer.
+    Each cell comes from the first layer with a non-empty value for it.
+    """
+    _sheet = None
+    _rows = []
+    _index = 0
+
+    def __init__(self, sheet, rows, index):
+        self._sheet = sheet
+        self._rows = rows
+        self._index = index
+
+    @property
+    def _columns(self):
+        return self._sheet._columns
+
+    def _cell(self, i):
+        """
+        Find the layer row and storage position that supply a column, by
+        index or by name. Returns None if the column is in the merged
+        sheet but none of this row's layers have it.
+        """
+        if isinstance(i, int):
+            if i >= len(self._columns):
+                return Error('COPY.%s.%i.%i [column index outside range]' % (
+                    self._sheet.name,
+                    self._index, i
+                ))
+
+            i = self._columns[i]
+
+        found = None
+
+        for row in self._rows:
+            position = row._sheet._column_index.get(i)
+
+            if position is None:
+                continue
+
+            if row._sheet._data[position][row._index] is not None:
+                return row, position
+
+            if found is None:
+                found = row, position
+
+        if found is None and i not in self._columns:
+            return Error('COPY.%s.%i.%s [column does not exist in sheet]' % (
+                self._sheet.name,
+                self._index,
+                i
+            ))
+
+        return found
+
+    def __getitem__(self, i):
+        """
+        Allow dict-style item access by index (column id), or by column name.
+        """
+        cell = self._cell(i)
+
+        if cell is None:
+            return ''
+
+        if isinstance(cell, Error):
+            return cell
+
+        row, position = cell
+
+        return row._sheet._cell_text(position, row._index)
+
+    def typed(self, i):
+        """
+        Get a cell's stored value without converting it to text.
+        """
+        cell = self._cell(i)
+
+        if cell is None or isinstance(cell, Error):
+            return cell
+
+        row, position = cell
+
+        return row._sheet._data[position][row._index]
+
+    def __iter__(self):
+        return iter([self.typed(column) for column in self._columns])
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __str__(self):
+        if 'value' in self._columns:
+            return self['value']
+
+        return Error('COPY.%s.%s [no value column in sheet]' % (
+            self._sheet.name,
+            self['key']
+        ))
+
+    def __html__(self):
+        return self.__str__()
+
+    def __bool__(self):
+        if 'value' in self._columns:
+            if self.typed('value') is None:
+                return False
+
+            return bool(len(self['value']))
+
+        return True
+
+    def __nonzero__(self):
+        return self.__bool__()
+
+
+class OverlaySheet(object):
+    """
+    A sheet that appears in more than one layer of an OverlayCopy.
+
+    Rows are matched up by key. They're in the order of the lowest
+    priority layer, followed by any keys only found in higher ones.
+
+    Like a Sheet, slicing or calling :meth:`page` returns a view of a
+    window of the same rows.
+    """
+    name = None
+    _sheets = []
+    _columns = []
+    _keys = []
+    _positions = {}
+    _start = 0
+    _step = 1
+    _length = 0
+
+    def __init__(self, name, sheets):
+        self.name = name
+        self._sheets = sheets
+        self._columns = []
+        self._keys = []
+        self._positions = {}
+
+        for sheet in reversed(sheets):
+            for column in sheet._columns:
+                if column not in self._columns:
+                    self._columns.append(column)
+
+            for key in sheet._data[sheet._column_index['key']]:
+                key = _text(key)
+
+                if key not in self._positions:
+                    self._positions[key] = len(self._keys)
+                    self._keys.append(key)
+
+        self._length = len(self._keys)
+
+    def _view(self, start, step, length):
+        """
+        Make a sheet that shares this one's merged keys but only covers
+        ``length`` rows, starting at row ``start`` and ``step`` apart.
+        """
+        view = self.__class__.__new__(self.__class__)
+        view.__dict__.update(self.__dict__)
+        view._start = start
+        view._step = step
+        view._length = length
+
+        return view
+
+    def _contains(self, position):
+        """
+        Check whether a merged row is in this sheet.
+        """
+        offset = position - self._start
+
+        if offset % self._step:
+            return False
+
+        return 0 <= offset // self._step < self._length
+
+    def page(self, n, size):
+        """
+        Get page ``n``, counting from 1, of a sheet split into pages of
+        ``size`` rows. Pages past the end are empty.
+        """
+        if n < 1 or size < 1:
+            raise ValueError('Page number and size must be at least 1')
+
+        return self[(n - 1) * size:n * size]
+
+    def _row(self, position):
+        """
+        Gather the rows for a key from each layer that has it.
+        """
+        key = self._keys[position]
+        rows = []
+
+        for sheet in self._sheets:
+            row = sheet[key]
+
+            if not isinstance(row, Error):
+                rows.append(row)
+
+        return OverlayRow(self, rows, position)
+
+    def __getitem__(self, i):
+        """
+        Allow dict-style item access by index (row id), or by
+        row name ("key" column). Slices return a view of those rows.
+        """
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self._length)
+            length = len(six.moves.range(start, stop, step))
+
+            return self._view(
+                self._start + start * self._step,
+                self._step * step,
+                length
+            )
+
+        if isinstance(i, int):
+            position = i + self._length if i < 0 else i
+
+            if not 0 <= position < self._length:
+                return Error('COPY.%s.%i [row index outside range]' % (
+                    self.name,
+                    i
+                ))
+
+            return self._row(self._start + position * self._step)
+
+        position = self._positions.get(i)
+
+        if position is None or not self._contains(position):
+            return Error('COPY.%s.%s [key does not exist in sheet]' % (
+                self.name,
+                i
+            ))
+
+        return self._row(position)
+
+    def get_many(self, keys):
+        """
+        Look up a list of rows by index or key. Returns the rows (or
+        Errors) in the same order as ``keys``.
+        """
+        return [self[key] for key in keys]
+
+    def __iter__(self):
+        for i in six.moves.range(self._length):
+            yield self._row(self._start + i * self._step)
+
+    def __len__(self):
+        return self._length
+
+    def _serialize(self, typed=False):
+        """
+        Serialize the merged sheet in a JSON-ready format.
+        """
+        return _serialize_rows(self, self._columns, typed)
+
+    def json(self, typed=False):
+        """
+        Serialize the merged sheet as JSON.
+        """
+        return json.dumps(self._serialize(typed), default=_json_default)
+
+
+class OverlayCopy(object):
+    """
+    Stacks several loaded Copy objects, highest priority first, without
+    copying any of their data.
+
+    A sheet found in one layer is returned as is. Sheets with a "key"
+    column that appear in several layers are merged row by row and cell
+    by cell, so an override workbook only needs the rows and cells it
+    changes. Any other sheet comes whole from the highest priority layer
+    that has it.
+
+    ``layers`` is a plain list: replace an item to swap one layer without
+    touching the others.
+    """
+
+    def __init__(self, layers):
+        self.layers = list(layers)
+        self._merged = {}
+
+    def _names(self):
+        """
+        Every sheet name in any layer, lowest priority layer first.
+        """
+        names = []
+
+        for layer in reversed(self.layers):
+            for name in layer._copy:
+                if name not in names:
+                    names.append(name)
+
+        return names
+
+    def __getitem__(self, name):
+        """
+        Allow dict-style item access by sheet name.
+        """
+        sheets = [
+            layer._copy[name] for layer in self.layers
+            if name in layer._copy
+        ]
+
+        if not sheets:
+            return Error('COPY.%s [sheet does not exist]' % name)
+
+        if len(sheets) == 1:
+            return sheets[0]
+
+        if not all('key' in sheet._columns for sheet in sheets):
+            return sheets[0]
+
+        # Merged sheets are kept until one of their layers changes
+        merged = self._merged.get(name)
+
+        if merged is None or merged._sheets != sheets:
+            merged = OverlaySheet(name, sheets)
+            self._merged[name] = merged
+
+        return merged
+
+    def resolve_many(self, paths):
+        """
+        Resolve a list of COPY paths in one pass, see
+        :meth:`Copy.resolve_many`.
+        """
+        if not isinstance(paths, CompiledPaths):
+            paths = CompiledPaths(paths)
+
+        return paths.resolve(self)
+
+    def _serialize(self, typed=False):
+        """
+        Serialize the merged copy as an OrderedDict
+        """
+        obj = OrderedDict()
+
+        for name in self._names():
+            obj[name] = self[name]._serialize(typed)
+
+        return obj
+
+    def json(self, typed=False):
+        """
+        Serialize the merged copy as JSON.
+        """
+        return json.dumps(self._serialize(typed), default=_json_default)
+
+
+class CompiledPaths(object):
+    """
+    A list of COPY paths, checked and grouped by sheet once so that it can
+    be resolved against a Copy on every render.
+    """
+    _length = 0
+    _groups = None
+
+    def __init__(self, paths):
+        self._groups = OrderedDict()
+        self._length = 0
+
+        for position, path in enumerate(paths):
+            if isinstance(path, six.string_types):
+                path = (path,)
+
+            if not 1 <= len(path) <= 3:
+                raise ValueError(
+                    'COPY path must be (sheet, key, column), (sheet, key) '
+                    'or (sheet,), got %r' % (path,)
+                )
+
+            name = path[0]
+            key = path[1] if len(path) > 1 else None
+            column = path[2] if len(path) > 2 else None
+
+            self._groups.setdefault(name, []).append((position, key, column))
+            self._length += 1
+
+    def __len__(self):
+        return self._length
+
+    def resolve(self, copy):
+        """
+        Resolve every path against ``copy``.
+        """
+        results = [None] * self._length
+
+        for name, lookups in self._groups.items():
+            sheet = copy[name]
+
+            if isinstance(sheet, Error):
+                for position, key, column in lookups:
+                    results[position] = sheet
+
+                continue
+
+            keyed = [lookup for lookup in lookups if lookup[1] is not None]
+            rows = sheet.get_many([key for _, key, _ in keyed])
+
+            for position, key, column in lookups:
+                if key is None:
+                    results[position] = sheet
+
+            for (position, key, column), row in zip(keyed, rows):
+                if column is None:
+                    results[position] = row
+                else:
+                    results[position] = row[column]
+
+        return results
+
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokenize(text):
+    """
+    Split text into lowercase word tokens for SearchIndex.
+    """
+    return [token.lower() for token in _TOKEN.findall(text)]
+
+
+SearchHit = namedtuple('SearchHit', ['sheet', 'index', 'key', 'column'])
+
+
+class SearchIndex(object):
+    """
+    An inverted index of the words in every cell of a Copy.
+
+    Each sheet is indexed separately, so after reloading some sheets,
+    :meth:`refresh` only reindexes the sheets that changed. Cells are
+    indexed by their stored text, before any transforms.
+    """
+    _copy = None
+    _sheets = {}
+
+    def __init__(self, copy):
+        self._copy = copy
+        self._sheets = OrderedDict()
+        self.refresh()
+
+    def refresh(self):
+        """
+        Index sheets that are new or have been reloaded since the index
+        was last refreshed, and forget sheets that have gone. Returns the
+        names of the sheets that were indexed.
+        """
+        sheets = self._copy._copy
+        indexed = []
+
+        for name, sheet in sheets.items():
+            if name in self._sheets and self._sheets[name][0] is sheet:
+                continue
+
+            self._sheets[name] = self._index_sheet(sheet)
+            indexed.append(name)
+
+        for name in list(self._sheets):
+            if name not in sheets:
+                del self._sheets[name]
+
+        return indexed
+
+    def _index_sheet(self, sheet):
+        """
+        Build the postings for one sheet. Each token maps to a list of
+        (row index, column position) cells, and the tokens are also kept
+        sorted for prefix searches.
+        """
+        postings = {}
+
+        for position, column in enumerate(sheet._data):
+            for index, value in enumerate(column):
+                if value is None:
+                    continue
+
+                for token in set(_tokenize(_text(value))):
+                    postings.setdefault(token, []).append((index, position))
+
+        return sheet, postings, sorted(postings)
+
+    def _lookup(self, postings, tokens, tokens_sorted, prefix):
+        """
+        Find the cells of one sheet that contain every token. The last
+        token matches any indexed token that starts with it if ``prefix``
+        is True.
+        """
+        cells = None
+
+        for i, token in enumerate(tokens):
+            if prefix and i == len(tokens) - 1:
+                position = bisect.bisect_left(tokens_sorted, token)
+                matches = set()
+
+                while position < len(tokens_sorted):
+                    candidate = tokens_sorted[position]
+
+                    if not candidate.startswith(token):
+                        break
+
+                    matches.update(postings[candidate])
+                    position += 1
+            else:
+                matches = set(postings.get(token, ()))
+
+            cells = matches if cells is None else cells & matches
+
+            if not cells:
+                return set()
+
+        return cells
+
+    def search(self, query, prefix=False):
+        """
+        Find every cell containing all the words in ``query``. If
+        ``prefix`` is True, the last word also matches longer words that
+        start with it. Returns a list of :class:`SearchHit`, in sheet,
+        row and column order.
+        """
+        tokens = _tokenize(query)
+        hits = []
+
+        if not tokens:
+            return hits
+
+        for name, (sheet, postings, tokens_sorted) in self._sheets.items():
+            cells = self._lookup(postings, tokens, tokens_sorted, prefix)
+            key = sheet._column_index.get('key')
+
+            for index, position in sorted(cells):
+                if key is None:
+                    row_key = None
+                else:
+                    row_key = _text(sheet._data[key][index])
+
+                hits.append(SearchHit(
+                    name,
+                    index,
+                    row_key,
+                    sheet._columns[position]
+                ))
+
+        return hits
+
+
+def _convert(job):
+    """
+    Convert one workbook to JSON for the command-line tool. Returns the
+    filename, the JSON (when writing to stdout), a timing breakdown, the
+    number of empty rows skipped and an error message, if any. Runs in a
+    worker process.
+    """
+    filename = job[0]
+    timings = OrderedDict()
+
+    try:
+        return _convert_workbook(job, timings)
+    except CopyException as e:
+        return filename, None, timings, 0, str(e)
+    except Exception as e:
+        # One bad workbook shouldn't stop the rest of the batch
+        error = '"%s" could not be converted: %s' % (filename, e)
+
+        return filename, None, timings, 0, error
+
+
+def _convert_workbook(job, timings):
+    """
+    Do the work for _convert, recording timings as it goes.
+    """
+    filename, output, per_sheet, typed = job
+
+    start = time.time()
+    copy = Copy(filename, typed=typed)
+    timings['load'] = time.time() - start
+    skipped = sum(stats['skipped_rows'] for stats in copy.stats.values())
+    start = time.time()
+
+    if per_sheet:
+        documents = [
+            (os.path.join(output, '%s.json' % name), sheet.json(typed))
+            for name, sheet in copy._copy.items()
+        ]
+    else:
+        documents = [(output, copy.json(typed))]
+
+    timings['serialize'] = time.time() - start
+
+    if output is None:
+        return filename, documents[0][1], timings, skipped, None
+
+    start = time.time()
+
+    if per_sheet and not os.path.isdir(output):
+        os.makedirs(output)
+
+    for path, document in documents:
+        with open(path, 'w') as f:
+            f.write(document)
+
+    timings['write'] = time.time() - start
+
+    return filename, None, timings, skipped, None
+
+
+def main(argv=None):
+    """
+    Entry point for the ``copytext`` command.
+    """
+    parser = argparse.ArgumentParser(
+        prog='copytext',
+        description='Convert XLSX copy workbooks to JSON.'
+    )
+    parser.add_argument(
+        'filenames', metavar='FILE', nargs='+',
+        help='XLSX workbook to convert'
+    )
+    parser.add_argument(
+        '-o', '--output', metavar='DIR',
+        help='Directory to write JSON to. Defaults to stdout for a single '
+             'workbook, or next to each workbook otherwise.'
+    )
+    parser.add_argument(
+        '-s', '--sheets', action='store_true',
+        help='Write one JSON file per sheet, in a directory named after '
+             'the workbook.'
+    )
+    parser.add_argument(
+        '-t', '--typed', action='store_true',
+        help='Keep numbers, dates and booleans instead of converting '
+             'every cell to text.'
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='Number of workbooks to convert in parallel. Defaults to the '
+             'number of CPUs.'
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help='Print a load/serialize/write timing breakdown to stderr.'
+    )
+    args = parser.parse_args(argv)
+
+    to_stdout = (
+        args.output is None and
+        not args.sheets and
+        len(args.filenames) == 1
+    )
+
+    jobs = []
+
+    for filename in args.filenames:
+        if to_stdout:
+            output = None
+        else:
+            directory = args.output or os.path.dirname(filename)
+            name = os.path.splitext(os.path.basename(filename))[0]
+
+            if args.sheets:
+                output = os.path.join(directory, name)
+            else:
+                output = os.path.join(directory, '%s.json' % name)
+
+        jobs.append((filename, output, args.sheets, args.typed))
+
+    if args.output and not os.path.isdir(args.output):
+        os.makedirs(args.output)
+
+    processes = min(args.jobs or multiprocessing.cpu_count(), len(jobs))
+
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+
+        try:
+            results = pool.map(_convert, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_convert(job) for job in jobs]
+
+    status = 0
+    total = OrderedDict()
+
+    for filename, document, timings, skipped, error in results:
+        if error:
+            sys.stderr.write('%s\n' % error)
+            status = 1
+            continue
+
+        if document is not None:
+            sys.stdout.write(document)
+            sys.stdout.write('\n')
+
+        if args.profile:
+            sys.stderr.write('%s: %s (skipped %i empty rows)\n' % (
+                filename,
+                ', '.join(
+                    '%s %.3fs' % (step, seconds)
+                    for step, seconds in timings.items()
+                ),
+                skipped
+            ))
+
+            for step, seconds in timings.items():
+                total[step] = total.get(step, 0) + seconds
+
+    if args.profile and len(results) > 1:
+        sys.stderr.write('total: %s\n' % ', '.join(
+            '%s %.3fs' % (step, seconds) for step, seconds in total.items()
+        ))
+
+    return status
+
 
-        return json.dumps(self._serialize())
+if __name__ == '__main__':
+    sys.exit(main())
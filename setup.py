@@ -26,8 +26,13 @@ setup(
         'Topic :: Software Development :: Libraries :: Python Modules',
     ],
     py_modules=['copytext'],
+    entry_points={
+        'console_scripts': [
+            'copytext = copytext:main'
+        ]
+    },
     install_requires=[
-        'openpyxl>=2.1.4',
+        'openpyxl>=2.5.0',
         'six>=1.10.0'
     ],
     extras_require={
@@ -2,7 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import json
+import os
+import shutil
 import six
+import sys
+import tempfile
 import unittest2 as unittest
 
 from six import string_types
@@ -207,6 +211,62 @@ class GoogleDocsTestCase(unittest.TestCase):
         self.assertEqual(len(row._columns), 2)
         self.assertEqual(len(row._row), 2)
 
+    def test_stats(self):
+        stats = self.copy.stats['data_bar']
+
+        self.assertEqual(stats['rows'], 7)
+        self.assertEqual(stats['skipped_rows'], 992)
+
+class EmptyRowsTestCase(unittest.TestCase):
+    """
+    Test that scanning stops after a run of empty rows.
+    """
+    def test_max_empty_rows(self):
+        copy = copytext.Copy('examples/from_google.xlsx', max_empty_rows=10)
+        stats = copy.stats['data_bar']
+
+        self.assertEqual(len(copy['data_bar']), 7)
+        self.assertEqual(stats['rows'], 7)
+        self.assertEqual(stats['skipped_rows'], 10)
+
+    def test_unlimited(self):
+        copy = copytext.Copy('examples/test_copy.xlsx', max_empty_rows=None)
+        stats = copy.stats['attribution']
+
+        self.assertEqual(len(copy['attribution']), 4)
+        self.assertEqual(stats['rows'], 4)
+        self.assertEqual(stats['skipped_rows'], 995)
+        self.assertEqual(stats['unscanned_rows'], 0)
+
+    def test_unscanned_rows(self):
+        copy = copytext.Copy('examples/test_copy.xlsx', max_empty_rows=5)
+        stats = copy.stats['attribution']
+
+        self.assertEqual(len(copy['attribution']), 4)
+        self.assertEqual(stats['skipped_rows'], 5)
+        self.assertEqual(stats['unscanned_rows'], 990)
+
+class DuplicateColumnsTestCase(unittest.TestCase):
+    """
+    Test that a repeated header reads from its last column.
+    """
+    def setUp(self):
+        self.copy = copytext.Copy('examples/duplicate_columns.xlsx')
+
+    def test_row(self):
+        row = self.copy['s']['a']
+
+        self.assertEqual(str(row), 'second')
+        self.assertEqual(row['value'], 'second')
+        self.assertEqual(row[1], 'second')
+        self.assertEqual(list(self.copy['list'][0]), ['second', 'second', 'third'])
+
+    def test_json(self):
+        data = json.loads(self.copy.json())
+
+        self.assertEqual(data['s'], {'a': 'second'})
+        self.assertEqual(data['list'], [{'term': 'second', 'definition': 'third'}])
+
 class MarkupTestCase(unittest.TestCase):
     """
     Test strings get Markup'd.
@@ -287,3 +347,515 @@ class ErrorTestCase(unittest.TestCase):
 
     def test_falsey(self):
         self.assertIs(True if self.error else False, False)
+
+class TypedCopyTestCase(unittest.TestCase):
+    """
+    Test a Copy that keeps native cell values.
+    """
+    def setUp(self):
+        self.copy = copytext.Copy('examples/test_copy.xlsx', typed=True)
+        self.sheet = self.copy['graphic_data']
+
+    def test_cell_is_text(self):
+        row = self.sheet[0]
+        self.assertTrue(isinstance(row['longitude'], string_types))
+        self.assertEqual(row['longitude'], '40.926819')
+        self.assertEqual(row['contested'], '')
+
+    def test_typed_cell(self):
+        row = self.sheet[32]
+        self.assertEqual(row.typed('latitude'), 34.601562)
+        self.assertIs(row.typed('contested'), True)
+        self.assertEqual(row['contested'], 'True')
+
+    def test_typed_errors(self):
+        row = self.sheet[32]
+        error = row.typed('foo')
+        self.assertTrue(isinstance(error, copytext.Error))
+        self.assertEqual(error._error, 'COPY.graphic_data.32.foo [column does not exist in sheet]')
+
+    def test_json_matches_untyped(self):
+        untyped = copytext.Copy('examples/test_copy.xlsx')
+        self.assertEqual(self.copy.json(), untyped.json())
+
+    def test_typed_json(self):
+        data = json.loads(self.copy.json(typed=True))
+        row = data['graphic_data'][32]
+
+        self.assertEqual(row['latitude'], 34.601562)
+        self.assertIs(row['contested'], True)
+
+        data = self.copy['example_list']._serialize(typed=True)
+        self.assertEqual(data[3]['definition'], None)
+
+    def test_typed_json_dates(self):
+        copy = copytext.Copy('examples/typed_copy.xlsx', typed=True)
+        data = json.loads(copy.json(typed=True))
+
+        self.assertEqual(data['results']['updated'], '2016-11-08T21:30:00')
+        self.assertEqual(data['results']['runtime'], 108000.0)
+        self.assertEqual(data['results']['votes'], 1234)
+
+class ResolveManyTestCase(unittest.TestCase):
+    """
+    Test batch lookups.
+    """
+    def setUp(self):
+        self.copy = copytext.Copy('examples/test_copy.xlsx')
+
+    def test_get_many(self):
+        sheet = self.copy['content']
+        rows = sheet.get_many(['header_title', 1, 'foo', 65])
+
+        self.assertEqual(str(rows[0]), 'Across-The-Top Header')
+        self.assertEqual(rows[1]._index, 1)
+        self.assertEqual(rows[2]._error, 'COPY.content.foo [key does not exist in sheet]')
+        self.assertEqual(rows[3]._error, 'COPY.content.65 [row index outside range]')
+
+    def test_get_many_without_key_column(self):
+        rows = self.copy['example_list'].get_many([0, 'foo'])
+
+        self.assertEqual(rows[0]['term'], 'jabberwocky')
+        self.assertEqual(rows[1]._error, 'COPY.example_list.foo [no key column in sheet]')
+
+    def test_resolve_many(self):
+        values = self.copy.resolve_many([
+            ('content', 'header_title', 'value'),
+            ('attribution', 'byline'),
+            ('example_list', 0, 'term'),
+            ('content',),
+            ('foo', 'bar', 'baz'),
+            ('content', 'header_title', 'foo'),
+        ])
+
+        self.assertEqual(values[0], 'Across-The-Top Header')
+        self.assertEqual(str(values[1]), u'Uñicodë')
+        self.assertEqual(values[2], 'jabberwocky')
+        self.assertIs(values[3], self.copy['content'])
+        self.assertEqual(values[4]._error, 'COPY.foo [sheet does not exist]')
+        self.assertEqual(values[5]._error, 'COPY.content.0.foo [column does not exist in sheet]')
+
+    def test_compiled_paths(self):
+        paths = copytext.CompiledPaths([
+            ('content', 'lorem_ipsum', 'key'),
+            ('content', 'footer_title', 'value'),
+        ])
+
+        self.assertEqual(len(paths), 2)
+        self.assertEqual(self.copy.resolve_many(paths), ['lorem_ipsum', '<strong>This content goes to 12</strong>'])
+        self.assertEqual(paths.resolve(self.copy), self.copy.resolve_many(paths))
+
+    def test_invalid_path(self):
+        with self.assertRaises(ValueError):
+            copytext.CompiledPaths([('content', 'header_title', 'value', 'foo')])
+
+class CommandLineTestCase(unittest.TestCase):
+    """
+    Test the copytext command.
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.stdout = sys.stdout
+        self.stderr = sys.stderr
+        sys.stdout = six.StringIO()
+        sys.stderr = six.StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        sys.stderr = self.stderr
+        shutil.rmtree(self.tmpdir)
+
+    def test_stdout(self):
+        status = copytext.main(['examples/test_copy.xlsx'])
+        data = json.loads(sys.stdout.getvalue())
+
+        self.assertEqual(status, 0)
+        self.assertEqual(data['attribution']['byline'], u'Uñicodë')
+
+    def test_output_directory(self):
+        status = copytext.main([
+            'examples/test_copy.xlsx',
+            'examples/from_google.xlsx',
+            '-o', self.tmpdir,
+            '-j', '2'
+        ])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['from_google.json', 'test_copy.json'])
+
+        with open(os.path.join(self.tmpdir, 'test_copy.json')) as f:
+            data = json.load(f)
+
+        self.assertEqual(data['content']['header_title'], 'Across-The-Top Header')
+
+    def test_per_sheet(self):
+        copytext.main(['examples/test_copy.xlsx', '--sheets', '-o', self.tmpdir])
+
+        with open(os.path.join(self.tmpdir, 'test_copy', 'example_list.json')) as f:
+            data = json.load(f)
+
+        self.assertEqual(data[0]['term'], 'jabberwocky')
+
+    def test_profile(self):
+        copytext.main(['examples/test_copy.xlsx', '--profile', '-o', self.tmpdir])
+        profile = sys.stderr.getvalue()
+
+        self.assertTrue('examples/test_copy.xlsx: load ' in profile)
+        self.assertTrue('serialize ' in profile)
+        self.assertTrue('write ' in profile)
+        self.assertTrue('(skipped 995 empty rows)' in profile)
+
+    def test_missing_file(self):
+        status = copytext.main(['examples/foo.xlsx'])
+
+        self.assertEqual(status, 1)
+        self.assertTrue('"examples/foo.xlsx" does not exist' in sys.stderr.getvalue())
+
+    def test_bad_file(self):
+        bad = os.path.join(self.tmpdir, 'bad.xlsx')
+        output = os.path.join(self.tmpdir, 'json')
+
+        with open(bad, 'w') as f:
+            f.write('not a workbook')
+
+        status = copytext.main([bad, 'examples/test_copy.xlsx', '-o', output, '-j', '2'])
+
+        self.assertEqual(status, 1)
+        self.assertTrue('"%s" could not be converted' % bad in sys.stderr.getvalue())
+        self.assertEqual(os.listdir(output), ['test_copy.json'])
+
+class SharedCopyTestCase(unittest.TestCase):
+    """
+    Test dumping a Copy and attaching to it.
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'copy.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+        copy = copytext.Copy('examples/test_copy.xlsx')
+        copy.dump(self.filename)
+        shared = copytext.SharedCopy(self.filename)
+
+        self.assertEqual(shared.json(), copy.json())
+        self.assertEqual(str(shared['content']['header_title']), 'Across-The-Top Header')
+        self.assertEqual(shared['attribution']['byline']['value'], u'Uñicodë')
+        self.assertEqual(shared['foo']._error, 'COPY.foo [sheet does not exist]')
+        self.assertEqual(os.listdir(self.tmpdir), ['copy.bin'])
+
+    def test_typed_round_trip(self):
+        copy = copytext.Copy('examples/test_copy.xlsx', typed=True)
+        copy.dump(self.filename)
+        shared = copytext.SharedCopy(self.filename)
+        row = shared['graphic_data'][32]
+
+        self.assertEqual(row.typed('latitude'), 34.601562)
+        self.assertIs(row.typed('contested'), True)
+        self.assertEqual(shared.json(typed=True), copy.json(typed=True))
+
+    def test_refresh(self):
+        copytext.Copy('examples/test_copy.xlsx').dump(self.filename)
+        shared = copytext.SharedCopy(self.filename)
+        sheet = shared['content']
+
+        self.assertFalse(shared.refresh())
+
+        copytext.Copy('examples/from_google.xlsx').dump(self.filename)
+
+        self.assertTrue(shared.refresh())
+        self.assertTrue(isinstance(shared['content'], copytext.Error))
+        self.assertTrue(isinstance(shared['labels'], copytext.Sheet))
+
+        # Sheets from the old dump are still readable
+        self.assertEqual(str(sheet['header_title']), 'Across-The-Top Header')
+
+    def test_not_a_dump(self):
+        with self.assertRaises(copytext.CopyException):
+            copytext.SharedCopy('examples/test_copy.xlsx')
+
+        with self.assertRaises(copytext.CopyException):
+            copytext.SharedCopy(os.path.join(self.tmpdir, 'foo.bin'))
+
+class TransformTestCase(unittest.TestCase):
+    """
+    Test cell transforms.
+    """
+    def setUp(self):
+        self.calls = []
+        self.copy = copytext.Copy('examples/test_copy.xlsx')
+
+    def upper(self, text):
+        self.calls.append(text)
+        return text.upper()
+
+    def test_lazy(self):
+        self.copy.add_transform(self.upper, sheet='content', column='value')
+        row = self.copy['content']['header_title']
+
+        self.assertEqual(self.calls, [])
+        self.assertEqual(str(row), 'ACROSS-THE-TOP HEADER')
+        self.assertEqual(row.__html__(), 'ACROSS-THE-TOP HEADER')
+        self.assertEqual(row['value'], 'ACROSS-THE-TOP HEADER')
+        self.assertEqual(row['key'], 'header_title')
+        self.assertEqual(self.calls, ['Across-The-Top Header'])
+
+    def test_eager(self):
+        self.copy.add_transform(self.upper, sheet='example_list', lazy=False)
+
+        self.assertEqual(len(self.calls), 8)
+
+        row = self.copy['example_list'][0]
+
+        self.assertEqual(row['term'], 'JABBERWOCKY')
+        self.assertEqual(len(self.calls), 8)
+
+    def test_scope(self):
+        self.copy.add_transform(self.upper, column='name')
+
+        self.assertEqual(self.copy['key_without_value']['first-last']['name'], 'FIRST LAST')
+        self.assertEqual(self.copy['key_without_value']['first-last']['bio'], 'foo')
+        self.assertEqual(self.copy['graphic_data'][0]['name'], 'ABU KAMAL')
+        self.assertEqual(str(self.copy['content']['header_title']), 'Across-The-Top Header')
+
+    def test_pipeline(self):
+        self.copy.add_transform(self.upper, sheet='content')
+        self.copy.add_transform(lambda text: '<p>%s</p>' % text, sheet='content')
+
+        self.assertEqual(str(self.copy['content']['header_title']), '<p>ACROSS-THE-TOP HEADER</p>')
+        self.assertEqual(self.copy['content']['header_title']['key'], 'header_title')
+
+    def test_json(self):
+        self.copy.add_transform(self.upper, sheet='example_list')
+        data = json.loads(self.copy.json())
+
+        self.assertEqual(data['example_list'][0]['term'], 'JABBERWOCKY')
+        self.assertEqual(data['example_list'][3]['definition'], None)
+
+    def test_reload(self):
+        copy = copytext.Copy('examples/test_copy.xlsx', transforms=[
+            copytext.Transform(self.upper, sheet='content', column='value')
+        ])
+
+        str(copy['content']['header_title'])
+        str(copy['content']['header_title'])
+        self.assertEqual(len(self.calls), 1)
+
+        copy.load()
+        self.assertEqual(str(copy['content']['header_title']), 'ACROSS-THE-TOP HEADER')
+        self.assertEqual(len(self.calls), 2)
+
+class SheetViewTestCase(unittest.TestCase):
+    """
+    Test slicing and paging sheets.
+    """
+    def setUp(self):
+        self.copy = copytext.Copy('examples/test_copy.xlsx')
+        self.sheet = self.copy['graphic_data']
+
+    def test_slice(self):
+        view = self.sheet[2:5]
+
+        self.assertTrue(isinstance(view, copytext.Sheet))
+        self.assertEqual(len(view), 3)
+        self.assertEqual([row['id'] for row in view], [row['id'] for row in list(self.sheet)[2:5]])
+        self.assertIs(view._data, self.sheet._data)
+
+    def test_slice_index(self):
+        view = self.sheet[2:5]
+
+        self.assertEqual(view[0]['id'], self.sheet[2]['id'])
+        self.assertEqual(view[-1]['id'], self.sheet[4]['id'])
+        self.assertEqual(view[3]._error, 'COPY.graphic_data.3 [row index outside range]')
+
+    def test_slice_of_slice(self):
+        view = self.sheet[::-1][1:10:3]
+        expected = list(self.sheet)[::-1][1:10:3]
+
+        self.assertEqual([row['id'] for row in view], [row['id'] for row in expected])
+
+    def test_slice_keys(self):
+        sheet = self.copy['content']
+        view = sheet[1:3]
+
+        self.assertEqual(str(view['lorem_ipsum']), str(sheet['lorem_ipsum']))
+        self.assertEqual(view['header_title']._error, 'COPY.content.header_title [key does not exist in sheet]')
+        self.assertEqual(len(view.get_many(['footer_title', 'nothing'])[1]), 1)
+
+    def test_slice_json(self):
+        data = json.loads(self.copy['content'][1:3].json())
+
+        self.assertEqual(list(data.keys()), ['lorem_ipsum', 'footer_title'])
+
+        data = self.copy['example_list'][:1]._serialize()
+
+        self.assertEqual(data, [{'term': 'jabberwocky', 'definition': 'Invented or meaningless language; nonsense.'}])
+
+    def test_view_of_empty_sheet(self):
+        sheet = copytext.Sheet('empty', [[]], ['key'])
+        view = sheet[:][:]
+
+        self.assertIs(view._base, sheet)
+        self.assertEqual(len(view), 0)
+
+    def test_page(self):
+        page = self.sheet.page(3, 10)
+
+        self.assertEqual(len(page), 10)
+        self.assertEqual(page[0]['id'], self.sheet[20]['id'])
+        self.assertEqual(len(self.sheet.page(4, 10)), 3)
+        self.assertEqual(len(self.sheet.page(5, 10)), 0)
+
+        with self.assertRaises(ValueError):
+            self.sheet.page(0, 10)
+
+    def test_view_transforms(self):
+        view = self.sheet[:2]
+        self.copy.add_transform(lambda text: text.upper(), column='name')
+
+        self.assertEqual(view[0]['name'], 'ABU KAMAL')
+
+class OverlayCopyTestCase(unittest.TestCase):
+    """
+    Test stacking copies.
+    """
+    def setUp(self):
+        self.base = copytext.Copy('examples/test_copy.xlsx')
+        self.override = copytext.Copy('examples/override_copy.xlsx')
+        self.copy = copytext.OverlayCopy([self.override, self.base])
+
+    def test_single_layer_sheet(self):
+        self.assertIs(self.copy['attribution'], self.base['attribution'])
+        self.assertIs(self.copy['edition'], self.override['edition'])
+        self.assertEqual(self.copy['foo']._error, 'COPY.foo [sheet does not exist]')
+
+    def test_list_sheet(self):
+        self.assertIs(self.copy['example_list'], self.override['example_list'])
+
+    def test_keys(self):
+        sheet = self.copy['content']
+
+        self.assertTrue(isinstance(sheet, copytext.OverlaySheet))
+        self.assertEqual(len(sheet), 5)
+        self.assertEqual(str(sheet['header_title']), 'Ohio Header')
+        self.assertEqual(str(sheet['lorem_ipsum']), str(self.base['content']['lorem_ipsum']))
+        self.assertEqual(str(sheet['state']), 'Ohio')
+        self.assertEqual(sheet['foo']._error, 'COPY.content.foo [key does not exist in sheet]')
+        self.assertEqual([row['key'] for row in sheet], ['header_title', 'lorem_ipsum', 'footer_title', 'nothing', 'state'])
+
+    def test_cells(self):
+        sheet = self.copy['key_without_value']
+        row = sheet['first-last']
+
+        self.assertEqual(sheet._columns, ['key', 'name', 'bio', 'state'])
+        self.assertEqual(row['name'], 'first last')
+        self.assertEqual(row['state'], 'OH')
+        self.assertEqual(sheet['hi-lo']['state'], '')
+        self.assertEqual(row['foo']._error, 'COPY.key_without_value.0.foo [column does not exist in sheet]')
+
+    def test_empty_cell_falls_through(self):
+        row = self.copy['content']['footer_title']
+
+        self.assertEqual(str(row), '<strong>This content goes to 12</strong>')
+        self.assertIs(True if self.copy['content']['nothing'] else False, False)
+
+    def test_json(self):
+        data = json.loads(self.copy.json())
+
+        self.assertEqual(list(data.keys()), ['attribution', 'content', 'example_list', 'key_without_value', 'graphic_data', 'edition'])
+        self.assertEqual(data['content']['header_title'], 'Ohio Header')
+        self.assertEqual(data['key_without_value']['new-name'], {'name': 'new name', 'bio': '', 'state': 'OH'})
+        self.assertEqual(data['example_list'], [{'term': 'buckeye', 'definition': 'A tree, or a person from Ohio.'}])
+
+    def test_resolve_many(self):
+        values = self.copy.resolve_many([
+            ('content', 'header_title', 'value'),
+            ('content', 'lorem_ipsum', 'key'),
+        ])
+
+        self.assertEqual(values, ['Ohio Header', 'lorem_ipsum'])
+
+    def test_slice(self):
+        sheet = self.copy['content']
+        view = sheet[1:3]
+
+        self.assertTrue(isinstance(view, copytext.OverlaySheet))
+        self.assertEqual([row['key'] for row in view], ['lorem_ipsum', 'footer_title'])
+        self.assertEqual(view[0]['key'], 'lorem_ipsum')
+        self.assertEqual(view[2]._error, 'COPY.content.2 [row index outside range]')
+        self.assertEqual(str(view['footer_title']), '<strong>This content goes to 12</strong>')
+        self.assertEqual(view['header_title']._error, 'COPY.content.header_title [key does not exist in sheet]')
+        self.assertEqual(list(json.loads(view.json()).keys()), ['lorem_ipsum', 'footer_title'])
+        self.assertEqual([row['key'] for row in sheet[::-2]], ['state', 'footer_title', 'header_title'])
+
+    def test_page(self):
+        sheet = self.copy['content']
+
+        self.assertEqual([row['key'] for row in sheet.page(1, 2)], ['header_title', 'lorem_ipsum'])
+        self.assertEqual([row['key'] for row in sheet.page(3, 2)], ['state'])
+        self.assertEqual(len(sheet.page(4, 2)), 0)
+
+        with self.assertRaises(ValueError):
+            sheet.page(1, 0)
+
+    def test_swap_layer(self):
+        sheet = self.copy['content']
+        self.assertIs(self.copy['content'], sheet)
+
+        self.copy.layers[0] = copytext.Copy('examples/from_google.xlsx')
+
+        self.assertIs(self.copy['content'], self.base['content'])
+        self.assertEqual(self.copy['labels']['headline']['value'], 'Test JSON Data Object')
+
+class SearchIndexTestCase(unittest.TestCase):
+    """
+    Test full-text search.
+    """
+    def setUp(self):
+        self.copy = copytext.Copy('examples/test_copy.xlsx')
+        self.index = copytext.SearchIndex(self.copy)
+
+    def test_search(self):
+        hits = self.index.search('Tikrit')
+
+        self.assertEqual(hits, [
+            copytext.SearchHit('graphic_data', 26, None, 'name'),
+            copytext.SearchHit('graphic_data', 32, None, 'name'),
+        ])
+
+    def test_search_key(self):
+        hits = self.index.search('header')
+
+        self.assertEqual(hits, [copytext.SearchHit('content', 0, 'header_title', 'value')])
+
+        hits = self.index.search('header', prefix=True)
+
+        self.assertEqual(hits, [
+            copytext.SearchHit('content', 0, 'header_title', 'key'),
+            copytext.SearchHit('content', 0, 'header_title', 'value'),
+        ])
+
+    def test_all_words(self):
+        hits = self.index.search('holy GRENADE')
+
+        self.assertEqual(hits, [copytext.SearchHit('example_list', 1, None, 'definition')])
+        self.assertEqual(self.index.search('holy jabberwocky'), [])
+        self.assertEqual(self.index.search(''), [])
+
+    def test_prefix(self):
+        self.assertEqual(self.index.search('jabber'), [])
+
+        hits = self.index.search('jabber', prefix=True)
+
+        self.assertEqual(hits, [copytext.SearchHit('example_list', 0, None, 'term')])
+        self.assertEqual(len(self.index.search('holy hand gren', prefix=True)), 1)
+
+    def test_refresh(self):
+        self.assertEqual(self.index.refresh(), [])
+
+        self.copy.load(sheets=['content'])
+
+        self.assertEqual(self.index.refresh(), ['content'])
+        self.assertEqual(len(self.index.search('header', prefix=True)), 2)